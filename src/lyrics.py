@@ -4,7 +4,8 @@ import sys
 import re
 import difflib
 import itertools
-from mutagen import id3, easyid3
+import mutagen
+from mutagen import id3, easyid3, easymp4
 import argparse
 from pathlib import Path
 
@@ -40,7 +41,7 @@ def read_lines_from_file(filename):
 
 
 def looks_like_song_filename(s):
-    return Path(s).suffix == '.mp3'
+    return Path(s).suffix.lower() in audio_file_types
 
 
 class Roman:
@@ -57,7 +58,7 @@ class Roman:
         return Roman.parse(s[1:], sofar + chomp)
 
 
-# Handling ID3 tags and MP3 files
+# Handling audio file tags: ID3 for MP3, Vorbis comments for FLAC and Ogg, MP4 atoms for M4A
 
 uslt_key = 'USLT::eng'
 
@@ -85,27 +86,37 @@ def lyrics_lister(inst, _):
 
 
 easyid3.EasyID3.RegisterKey('lyrics', lyrics_getter, lyrics_setter, lyrics_deleter, lyrics_lister)
+easymp4.EasyMP4Tags.RegisterTextKey('lyrics', '\xa9lyr')
+
+# Suffixes of files treated as songs. The actual format is detected from file content by mutagen, and every format
+# exposes the same 'easy' dict-like tags, with Vorbis comments (FLAC, Ogg Vorbis, Opus) using LYRICS field natively
+audio_file_types = {'.mp3', '.flac', '.ogg', '.oga', '.opus', '.m4a', '.mp4'}
 
 
 class SongMP3:
     @staticmethod
     def from_path(path):
         def from_file(filename):
-            maybe_song = []
             try:
-                maybe_song = [SongMP3(filename)]
-            finally:
-                return maybe_song
+                return [SongMP3(filename)]
+            except Exception as e:
+                err(f"Cannot read tags of {filename}: {e}")
+                return []
 
         import glob
         from functools import reduce
-        song_file_candidates = sorted(glob.glob(path))
+        song_file_candidates = sorted(filter(looks_like_song_filename, glob.glob(path)))
         return None if len(song_file_candidates) == 0 \
             else list(reduce(lambda acc, val: acc + val, map(lambda f: from_file(f), song_file_candidates), []))
 
     def __init__(self, mp3file):
         self.path = mp3file
-        self.tags = tags = easyid3.EasyID3(str(mp3file))  # mp3_file.tags
+        self.audio = mutagen.File(str(mp3file), easy=True)
+        if self.audio is None:
+            raise ValueError(f"{mp3file} is not a supported audio file")
+        if self.audio.tags is None:
+            self.audio.add_tags()
+        self.tags = tags = self.audio.tags
         self.title = tags['title'][0] if 'title' in tags else Path(mp3file).stem  # TODO get title from filename only?
         self.album = tags['album'][0] if 'album' in tags else None
         self.artist = tags['artist'][0] if 'artist' in tags \
@@ -119,6 +130,19 @@ class SongMP3:
         else:
             self.tracknumber = None
 
+    def get_lyrics(self):
+        lyrics = self.tags.get('lyrics')  # EasyID3 gives a single string, other formats give a list of values
+        if type(lyrics) is list:
+            lyrics = "\r\n".join(lyrics) if len(lyrics) > 0 else None
+        return lyrics
+
+    def set_lyrics(self, lyrics):
+        if self.get_lyrics() == lyrics:
+            return False
+        self.tags['lyrics'] = lyrics
+        self.audio.save()
+        return True
+
     def __repr__(self):
         return f"Song \"{self.title}\" by {self.artist}, #{self.tracknumber} " \
                f"on the album \"{self.album}\" ({self.year})"
@@ -251,7 +275,7 @@ class Blob:
                                                                               len(self.lines) == 1)
 
     def to_lines(self):
-        return [l.line for l in self.lines] + [""] * self.blanks
+        return [l.line for l in self.lines if type(l) is not UnderLine] + [""] * self.blanks
 
     def __repr__(self):
         return self.lines.__repr__()
@@ -320,7 +344,10 @@ def similarity(title, model_vector):
 
 
 def find_song_header(file_lines, song_title):
-    parts = analyze_lyrics_file(file_lines)
+    return find_song_header_in_parts(analyze_lyrics_file(file_lines), song_title)
+
+
+def find_song_header_in_parts(parts, song_title):
     similarity_threshold = 0.9
     song_title_score_histogram = dict(map(lambda k: (k[0], list(k[1])),
                                           itertools.groupby(sorted(filter(lambda p: p.song_begins_score > 0, parts),
@@ -352,6 +379,21 @@ def trim_empty_lines(arr):
     return arr[first:last + 1]
 
 
+def lyrics_under_header(lyrics_header):
+    title_score = lyrics_header.song_begins_score
+    lyrics = [] if lyrics_header.header().is_underlined() else lyrics_header.to_lines()[1:]
+    cur_part = lyrics_header
+    while cur_part.next is not None:
+        next_part = cur_part.next
+        if next_part.type is Separator or ((next_part.type is TextLine)
+                                           and (next_part.song_begins_score >= title_score)):
+            break
+        if next_part.type in [TextLine, BlankLine]:
+            lyrics += next_part.to_lines()
+        cur_part = cur_part.next
+    return trim_empty_lines(lyrics)
+
+
 # TODO: can other file formats (MS Office doc for example) be looked up too?
 def get_lyrics_from_file(lyrics_file, song):
     song_title = title_of(song)
@@ -365,18 +407,7 @@ def get_lyrics_from_file(lyrics_file, song):
         err(f"> Lyrics for {song_title} not found in {lyrics_file}.")
         return None
 
-    title_score = lyrics_header.song_begins_score
-    lyrics = [] if lyrics_header.header().is_underlined() else lyrics_header.to_lines()[1:]
-    cur_part = lyrics_header
-    while cur_part.next is not None:
-        next_part = cur_part.next
-        if next_part.type is Separator or ((next_part.type is TextLine)
-                                           and (next_part.song_begins_score >= title_score)):
-            break
-        if next_part.type in [TextLine, BlankLine]:
-            lyrics += next_part.to_lines()
-        cur_part = cur_part.next
-    lyrics = trim_empty_lines(lyrics)
+    lyrics = lyrics_under_header(lyrics_header)
     if len(lyrics) > 0:
         log(f"Found lyrics for {song_title} in {lyrics_file}")
         return "\r\n".join(lyrics)
@@ -392,32 +423,39 @@ def get_lyrics_from_particular_file(lyrics_file):
 # Finding a default lyrics file for the song
 
 
+def default_lyrics_file_groups(song):
+    directory = Path(".")
+    txt_file_templates = {r'lyrics': []}
+    if type(song) is SongMP3:
+        directory = Path(song.path).parent
+        if song.album is not None:
+            txt_file_templates[song.album.lower()] = []
+            if song.artist is not None:
+                txt_file_templates[song.artist.lower() + " - " + song.album.lower()] = []
+    simi_threshold = 0.6
+    # <audio file name>.lyrics.txt files are exported lyrics sidecars, not lyrics booklets
+    sidecar_names = {txt_sidecar_of(f).name for f in directory.iterdir() if looks_like_song_filename(f)}
+    txt_files = [f for f in directory.iterdir() if f.suffix == ".txt" and f.name not in sidecar_names]
+    if len(txt_files) == 1:
+        return [txt_files]
+    for template in txt_file_templates:
+        matching = list(dict(sorted(filter(lambda kv: kv[1] > simi_threshold,
+                                           [(file,
+                                             difflib.SequenceMatcher(None, file.stem.lower(), template).ratio())
+                                            for file in txt_files]), key=lambda kv: kv[1])).keys())
+        txt_file_templates[template] = matching
+        for m in matching:
+            txt_files.remove(m)
+    return list(txt_file_templates.values())
+
+
+def default_lyrics_files(song):  # TODO make it into generator? use yield keyword?
+    from functools import reduce
+    return reduce(lambda a, b: a + b, default_lyrics_file_groups(song), [])
+
+
 def get_lyrics_from_default_file(song):
-    def default_lyrics_files():  # TODO make it into generator? use yield keyword?
-        from functools import reduce
-        directory = Path(".")
-        txt_file_templates = {r'lyrics': []}
-        if type(song) is SongMP3:
-            directory = Path(song.path).parent
-            if song.album is not None:
-                txt_file_templates[song.album.lower()] = []
-                if song.artist is not None:
-                    txt_file_templates[song.artist.lower() + " - " + song.album.lower()] = []
-        simi_threshold = 0.6
-        txt_files = [f for f in directory.iterdir() if f.suffix == ".txt"]
-        if len(txt_files) == 1:
-            return txt_files
-        for template in txt_file_templates:
-            matching = list(dict(sorted(filter(lambda kv: kv[1] > simi_threshold,
-                                               [(file,
-                                                 difflib.SequenceMatcher(None, file.stem.lower(), template).ratio())
-                                                for file in txt_files]), key=lambda kv: kv[1])).keys())
-            txt_file_templates[template] = matching
-            for m in matching:
-                txt_files.remove(m)
-        return reduce(lambda a, b: a + txt_file_templates[b], txt_file_templates, [])
-
-    for filename in default_lyrics_files():
+    for filename in default_lyrics_files(song):
         found_lyrics = get_lyrics_from_file(filename, title_of(song))
         if found_lyrics is not None:
             return found_lyrics
@@ -426,16 +464,102 @@ def get_lyrics_from_default_file(song):
 # Finding song in MP3 tags
 
 
-# TODO can ID3 tags be obtained from other audio file formats?
 def get_lyrics_from_tag(song, failover=get_lyrics_from_default_file):
-    if type(song) is SongMP3 and song.tags['lyrics']:
-        log(f"Found lyrics for {title_of(song)} in mp3 tag")
-        return song.tags['lyrics']
+    tag_lyrics = song.get_lyrics() if type(song) is SongMP3 else None
+    if tag_lyrics:
+        log(f"Found lyrics for {title_of(song)} in audio tag")
+        return tag_lyrics
     else:
-        err(f"Lyrics for {title_of(song)} not found in mp3 tag")
+        err(f"Lyrics for {title_of(song)} not found in audio tag")
         return failover(song) if failover is not None else None
 
 
+# Resolving lyrics from the cheapest and most confident source first: audio tag, which is already loaded,
+# then default lyrics files, template by template, smallest first. Files that don't contain enough of the title
+# to possibly match are not analyzed at all, and the search stops at a match of the exact title.
+# Headers found in different files are compared by title alone, as title score is relative to the file's structure.
+# Every song of an album is looked up in the same few files, so each file is decoded once and analyzed at most once
+# per run, unless it changes on disk.
+
+confident_distance = 0.0
+title_presence_threshold = 0.5
+title_model_vector = {"similarity_whole": 1.0,
+                      "longest_exact_match": 1.0,
+                      "nothing_after_match": True}
+lyrics_file_cache = {}
+
+
+def cached_lyrics_file(lyrics_file):
+    stat = Path(lyrics_file).stat()
+    key = str(Path(lyrics_file).resolve())
+    cached = lyrics_file_cache.get(key)
+    if cached is None or cached["stat"] != (stat.st_mtime_ns, stat.st_size):
+        file_lines = read_lines_from_file(lyrics_file)
+        cached = {"stat": (stat.st_mtime_ns, stat.st_size), "lines": file_lines,
+                  "text": normalize("".join(file_lines)), "parts": None}
+        lyrics_file_cache[key] = cached
+    return cached
+
+
+def title_may_be_in(file_lines, song_title, text=None):
+    text = normalize("".join(file_lines)) if text is None else text
+    title = normalize(song_title)
+    trigrams = {title[i:i + 3] for i in range(len(title) - 2)} or {title}
+    return sum(trigram in text for trigram in trigrams) >= title_presence_threshold * len(trigrams)
+
+
+def title_distance(song_title, lyrics_header):
+    return similarity(song_title, title_model_vector)(lyrics_header.header().essence, {})
+
+
+def confidence_of(distance):
+    return max(0.0, 1.0 - distance)
+
+
+def ranked_lyrics_files(song):
+    return [f for group in default_lyrics_file_groups(song) for f in sorted(group, key=lambda f: f.stat().st_size)]
+
+
+def resolve_lyrics_with_source(song):
+    # Returns found lyrics, where they were found, confidence of the match and lyrics header (None for tag)
+    song_title = title_of(song)
+    tag_lyrics = get_lyrics_from_tag(song, failover=None)
+    if tag_lyrics:
+        return tag_lyrics, "audio tag", confidence_of(0.0), None
+
+    best_distance, best_file, best_header, best_lyrics = None, None, None, None
+    for lyrics_file in ranked_lyrics_files(song):
+        cached = cached_lyrics_file(lyrics_file)
+        if not title_may_be_in(cached["lines"], song_title, cached["text"]):
+            log(f"Skipping {lyrics_file}, as {song_title} is not in it")
+            continue
+        if cached["parts"] is None:
+            cached["parts"] = analyze_lyrics_file(cached["lines"])
+        lyrics_header = find_song_header_in_parts(cached["parts"], song_title)
+        lyrics = lyrics_under_header(lyrics_header) if lyrics_header is not None else []
+        if len(lyrics) == 0:
+            continue
+        distance = title_distance(song_title, lyrics_header)
+        if best_distance is None or distance < best_distance:
+            best_distance, best_file, best_header, best_lyrics = distance, lyrics_file, lyrics_header, lyrics
+        if distance <= confident_distance:
+            break
+
+    if best_lyrics is None:
+        return None, None, None, None
+    return "\r\n".join(best_lyrics), best_file, confidence_of(best_distance), best_header
+
+
+def resolve_lyrics(song):
+    song_title = title_of(song)
+    lyrics, source, confidence, _ = resolve_lyrics_with_source(song)
+    if lyrics is None:
+        err(f"Lyrics for {song_title} not found in any lyrics file")
+    elif args.show_source or args.verbose:
+        print(f">>> Lyrics for {song_title} found in {source} with confidence {confidence:.2f}")
+    return lyrics
+
+
 # Processing found lyrics
 
 def song_header(song):
@@ -472,35 +596,161 @@ def save_lyrics_to_tag(lyrics, song):
         return
 
     if type(song) is not SongMP3:
-        err(f"Cannot save lyrics to tag, as {song} is not a mp3 file.")
+        err(f"Cannot save lyrics to tag, as {song} is not an audio file.")
         return
 
-    song.tags['lyrics'] = lyrics
-    song.tags.save()
+    if not song.set_lyrics(lyrics):
+        log(f"Lyrics in tag of {song.path} are unchanged, not saving")
+
+
+# Exporting lyrics to sidecar files next to audio files, so they can be served without reading audio tags
+
+lyrics_manifest_name = "lyrics.jsonl"
+# Names of sidecar files written by export, per album directory, so that files of the same name that were already
+# there (a booklet, or an .lrc with timestamps) are never overwritten
+exported_sidecars_name = ".lyrics-sidecars"
+
+
+def txt_sidecar_of(song_path):
+    return Path(song_path).with_name(Path(song_path).stem + ".lyrics.txt")
+
+
+def write_if_changed(path, content):
+    import os
+    import tempfile
+    path = Path(path)
+    data = content.encode("utf-8")
+    if path.exists() and path.read_bytes() == data:
+        return False
+    if path.exists():
+        mode = path.stat().st_mode & 0o777
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    # Temporary files are created readable by owner only, so give it the mode a plain write would have
+    with tempfile.NamedTemporaryFile("wb", dir=path.parent, prefix=f".{path.name}.", delete=False) as tmp:
+        try:
+            tmp.write(data)
+            tmp.close()
+            os.chmod(tmp.name, mode)
+            os.replace(tmp.name, path)
+        except BaseException:
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+    return True
+
+
+def lrc_of(song, lyrics):
+    lrc_tags = [f"[ar:{song.artist}]" if song.artist else None,
+                f"[al:{song.album}]" if song.album else None,
+                f"[ti:{song.title}]"]
+    return "\r\n".join([t for t in lrc_tags if t is not None] + lyrics.splitlines()) + "\r\n"
+
+
+def manifest_entry(song, lyrics):
+    return {"path": Path(song.path).name, "title": song.title, "artist": song.artist, "album": song.album,
+            "year": song.year, "tracknumber": song.tracknumber, "lyrics": lyrics}
+
+
+def read_lyrics_manifest(manifest_file):
+    import json
+    if not Path(manifest_file).exists():
+        return {}
+    try:
+        entries = {}
+        with open(manifest_file, encoding="utf-8") as mf:
+            for line_no, line in enumerate(mf, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if type(entry) is not dict or "path" not in entry:
+                    raise ValueError(f"line {line_no} is not an entry with a path")
+                entries[entry["path"]] = entry
+        return entries
+    except (OSError, ValueError) as e:
+        err(f"Cannot read lyrics manifest {manifest_file}: {e}")
+        return None
+
+
+def read_exported_sidecars(directory):
+    try:
+        return set(filter(None, (Path(directory) / exported_sidecars_name).read_text(encoding="utf-8").splitlines()))
+    except FileNotFoundError:
+        return set()
+
+
+def export_lyrics(songs_with_lyrics, formats):
+    import json
+    sidecars = {}
+    manifests = {}
+    for song, lyrics in songs_with_lyrics.items():
+        if type(song) is not SongMP3:
+            err(f"Cannot export lyrics, as {song} is not an audio file.")
+            continue
+        if 'lrc' in formats:
+            sidecars[Path(song.path).with_suffix(".lrc")] = lrc_of(song, lyrics)
+        if 'txt' in formats:
+            sidecars[txt_sidecar_of(song.path)] = lyrics
+        if 'jsonl' in formats:
+            manifests.setdefault(Path(song.path).parent / lyrics_manifest_name, []).append(manifest_entry(song, lyrics))
+
+    exported = {}
+    for sidecar in list(sidecars):
+        if sidecar.parent not in exported:
+            exported[sidecar.parent] = read_exported_sidecars(sidecar.parent)
+        if sidecar.exists() and sidecar.name not in exported[sidecar.parent]:
+            err(f"Not exporting lyrics to {sidecar}, as it was not written by lyrics export")
+            del sidecars[sidecar]
+        else:
+            exported[sidecar.parent].add(sidecar.name)
+    # Sidecars are listed before they are written, so that one left over by a failed export can be overwritten
+    for directory, names in exported.items():
+        if len(names) > 0:
+            write_if_changed(directory / exported_sidecars_name, "".join(name + "\n" for name in sorted(names)))
+
+    for manifest_file, entries in manifests.items():
+        album_entries = read_lyrics_manifest(manifest_file)
+        if album_entries is None:
+            err(f"Not exporting lyrics to {manifest_file}, so as not to lose entries of other tracks")
+            continue
+        album_entries.update({entry["path"]: entry for entry in entries})
+        sidecars[manifest_file] = "".join(json.dumps(album_entries[p], ensure_ascii=False) + "\n"
+                                          for p in sorted(album_entries))
+
+    for sidecar, content in sidecars.items():
+        if write_if_changed(sidecar, content):
+            log(f"Exported lyrics to {sidecar}")
+        else:
+            log(f"Lyrics in {sidecar} are unchanged, not exporting")
 
 
 # Parsing arguments
 
 
 parser = argparse.ArgumentParser(prog="LYRICS",
-                                 description="Find lyrics for given song(s) within mp3 tags or text file.\n"
-                                             "Prints it out to console, to a txt file or saves it to mp3 tags.")
+                                 description="Find lyrics for given song(s) within audio file tags or text file.\n"
+                                             "Prints it out to console, to a txt file or saves it to audio tags.")
 
-# SONGS - this can be a (possibly wildcard) path if you want one (or more) mp3 files.
-# If path doesn't resolve to any mp3 files, this is treated as a explicitly given song title.
+# SONGS - this can be a (possibly wildcard) path if you want one (or more) audio files (mp3, flac, ogg, opus, m4a).
+# If path doesn't resolve to any audio files, this is treated as a explicitly given song title.
 parser.add_argument('songs', nargs='+',
-                    help="Song or songs to look for lyrics to. By default resolves to mp3 file "
-                         "(or multiple files if wildcard path is given, to resolve one file at a time).\n"
-                         "If it doesn't point to any mp3 file, it is treated as explicitly given song title.")
+                    help="Song or songs to look for lyrics to. By default resolves to audio file "
+                         "(mp3, flac, ogg, opus or m4a; multiple files if wildcard path is given, "
+                         "to resolve one file at a time).\n"
+                         "If it doesn't point to any audio file, it is treated as explicitly given song title.")
 
-# SOURCE - source of lyrics: if not given, defaults to, in that order: mp3 tag, local txt file.
+# SOURCE - source of lyrics: if not given, defaults to, in that order: audio tag, local txt file,
+# stopping at a match of the exact title.
 # If given, is resolved to a txt file to look for lyrics in.
 parser.add_argument('--from', '--file', '-f', dest='get_lyrics_for', nargs='?',
-                    default=get_lyrics_from_tag,
+                    default=resolve_lyrics,
                     const=get_lyrics_from_default_file,
                     type=get_lyrics_from_particular_file,
                     help="Name of the lyrics text file to look in. If not given, looks for default file.\n"
-                         "If argument is omitted entirely, looks first in mp3 tag (if available) and then default file.")
+                         "If argument is omitted entirely, looks first in audio tag (if available) "
+                         "and then default files, skipping files without the title "
+                         "and stopping at a match of the exact title.")
 
 # TARGET - what to do with obtained lyrics? Save to txt file? Append to file? Print out to stdout?
 # By default prints out.
@@ -508,7 +758,11 @@ parser.add_argument('--out', '-o', dest='out_files', nargs='?', action='append',
                     type=argparse.FileType('a'),
                     help="Target file for the obtained lyrics to be appended to. If not given, print out to console.")
 parser.add_argument('--save', action='store_true',
-                    help="Flag to save obtained lyrics to an ID3 tag in respective mp3 file(s)'.\n"
+                    help="Flag to save obtained lyrics to a tag in respective audio file(s)'.\n"
+                         "If given, lyrics will not be printed out unless --out option is given specifically")
+parser.add_argument('--export', action='append', default=[], choices=['lrc', 'txt', 'jsonl'],
+                    help="Export found lyrics next to respective audio file(s): to .lrc or .lyrics.txt file per track, "
+                         "or to a " + lyrics_manifest_name + " manifest per album directory. Can be given repeatedly.\n"
                          "If given, lyrics will not be printed out unless --out option is given specifically")
 
 # PRINT FORMAT MODIFIERS
@@ -527,40 +781,54 @@ parser.add_argument('--not-found', nargs="?", default="No lyrics found.", const=
 # GENERAL OPTIONS
 parser.add_argument('--verbose', '-v', action='store_true',
                     help='Print log messages to console')
+parser.add_argument('--show-source', action='store_true',
+                    help="Print where lyrics for every song were found and how confident the match is, "
+                         "when looking in default sources. Always printed with --verbose.")
 parser.add_argument('--quiet', '-q', action='store_true',
                     help='Don\'t print error messages to error console')
 
-args = parser.parse_args()
-if len(args.out_files) == 0 and not args.save:
-    args.out_files = [sys.stdout]
-
-# Process song list: make existing files into MP3 files and leave given titles intact
-song_list = []
-for entry in args.songs:
-    entry_songs = SongMP3.from_path(entry)
-    song_list += [entry] if entry_songs is None else entry_songs
-
-# Find lyrics for every song
-songs_with_lyrics = {}
-for the_song in song_list:
-    the_lyrics = args.get_lyrics_for(the_song)
-    songs_with_lyrics[the_song] = args.not_found if the_lyrics is None else the_lyrics
-
-# Process lyrics
-if args.tracklist and len(songs_with_lyrics) > 0:
-    for out_file in args.out_files:
-        print_tracklist(songs_with_lyrics, file=out_file)
-
-for the_song in songs_with_lyrics:
+# Defaults for when imported as a module; the actual command line is parsed only when run as a script
+args = parser.parse_args([""])
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if len(args.out_files) == 0 and not args.save and len(args.export) == 0:
+        args.out_files = [sys.stdout]
+
+    # Process song list: make existing files into MP3 files and leave given titles intact
+    song_list = []
+    for entry in args.songs:
+        entry_songs = SongMP3.from_path(entry)
+        song_list += [entry] if entry_songs is None else entry_songs
+
+    # Find lyrics for every song
+    songs_with_lyrics = {}
+    songs_with_found_lyrics = {}
+    for the_song in song_list:
+        the_lyrics = args.get_lyrics_for(the_song)
+        songs_with_lyrics[the_song] = args.not_found if the_lyrics is None else the_lyrics
+        if the_lyrics is not None:
+            songs_with_found_lyrics[the_song] = the_lyrics
+
+    # Process lyrics
+    if args.tracklist and len(songs_with_lyrics) > 0:
+        for out_file in args.out_files:
+            print_tracklist(songs_with_lyrics, file=out_file)
+
+    for the_song in songs_with_lyrics:
+        for out_file in args.out_files:
+            print_lyrics(the_song, songs_with_lyrics[the_song], file=out_file)
+        if args.save:
+            save_lyrics_to_tag(songs_with_lyrics[the_song], the_song)
+
+    # Export all lyrics at once, so every sidecar file is written only once per run
+    if len(args.export) > 0:
+        export_lyrics(songs_with_found_lyrics, args.export)
+
+    # Close open files
     for out_file in args.out_files:
-        print_lyrics(the_song, songs_with_lyrics[the_song], file=out_file)
-    if args.save:
-        save_lyrics_to_tag(songs_with_lyrics[the_song], the_song)
-
-# Close open files
-for out_file in args.out_files:
-    if out_file is not sys.stdout:
-        out_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
 
 # TODO:
 # parsing args
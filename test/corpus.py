@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+
+# Synthetic lyrics booklets and album directory trees, for regression and timing runs of the lyrics matcher.
+
+import random
+import argparse
+from pathlib import Path
+
+words = ["love", "night", "fire", "river", "stone", "heart", "shadow", "light", "rain", "dream", "city", "ghost",
+         "road", "silver", "winter", "ocean", "broken", "golden", "falling", "wind", "sky", "home", "iron", "sea",
+         "burning", "empty", "wild", "morning", "glass", "tower", "garden", "machine", "velvet", "storm", "angel",
+         "paper", "thunder", "lonely", "quiet", "electric", "hollow", "distant", "crimson", "echo", "wolf", "steam"]
+accented_words = ["café", "über", "déjà", "söder", "régime", "fiancée", "smörgås", "Mötley", "naïve", "jalapeño"]
+fillers = ["and", "the", "of", "in", "my", "your", "we", "I", "you", "on", "to", "a", "all", "never", "again"]
+
+# Encodings seen in the wild in album booklets; each entry lists accented words it can represent
+encodings = {
+    "utf-8": accented_words,
+    "utf-8-sig": accented_words,
+    "utf-16": accented_words,
+    "cp1250": ["café", "über", "söder", "régime", "fiancée"],
+    "latin-1": ["café", "über", "déjà", "söder", "régime", "fiancée", "naïve", "jalapeño"],
+    "ascii": []
+}
+
+layouts = {
+    "numbered": {"numbering": "arabic"},
+    "roman": {"numbering": "roman"},
+    "underlined": {"underline": "-"},
+    "separated": {"separator": "=" * 30},
+    "uppercase": {"uppercase": True},
+    "tracklength": {"numbering": "arabic", "tracklength": True},
+    "tracklist": {"numbering": "arabic", "separator": "*" * 20, "tracklist": True},
+    "plain": {}
+}
+
+
+def to_roman(n):
+    numerals = [(1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+                (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i")]
+    roman = ""
+    for value, numeral in numerals:
+        while n >= value:
+            roman += numeral
+            n -= value
+    return roman
+
+
+def random_layout(rng):
+    layout = {}
+    layout["numbering"] = rng.choice([None, "arabic", "roman"])
+    layout["underline"] = rng.choice([None, None, "-", "="])
+    layout["separator"] = rng.choice([None, "=" * 30, "-=" * 15, "*" * 20, "#" * 10])
+    layout["uppercase"] = rng.random() < 0.25
+    layout["tracklength"] = rng.random() < 0.4
+    layout["tracklist"] = layout["numbering"] is not None and rng.random() < 0.3
+    return layout
+
+
+def random_title(rng, taken):
+    while True:
+        title = " ".join(w.capitalize() for w in rng.sample(words, rng.randint(1, 4)))
+        if title.lower() not in [t.lower() for t in taken]:
+            return title
+
+
+def overlapping_title(rng, related, taken):
+    """A title that contains, or is contained in, one of related titles: the hardest case for the matcher"""
+    for _ in range(10):
+        base = rng.choice(related)
+        base_words = base.split()
+        title = rng.choice([f"{base} {' '.join(w.capitalize() for w in rng.sample(words, rng.randint(1, 2)))}",
+                            f"{base}?",
+                            f"{base} (Reprise)",
+                            f"{base} Part II",
+                            " ".join(base_words[:-1]) if len(base_words) > 1 else f"The {base}"])
+        if title.lower() not in [t.lower() for t in taken]:
+            return title
+    return random_title(rng, taken)
+
+
+def prose_block(rng, titles):
+    """Credits or liner notes, possibly mentioning song titles, which are not lyrics of any song"""
+    name = " ".join(w.capitalize() for w in rng.sample(words, 2))
+    return rng.choice([
+        [f"Recorded at {name} Studios", f"Produced by {name}", "All songs written and arranged by the band"],
+        [f"Thanks to {name} and everyone who believed in {rng.choice(titles)}."],
+        [f"{title} - music by {name}" for title in rng.sample(titles, min(3, len(titles)))],
+        [f"Liner notes: {rng.choice(titles)} was written on the road, and {rng.choice(titles)} "
+         f"was the last one we recorded."]])
+
+
+def random_verse_line(rng, encoding):
+    vocabulary = words + fillers * 2 + encodings[encoding]
+    line = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 9)))
+    return line[0].upper() + line[1:]
+
+
+def song_header_lines(layout, tracknumber, title, tracklength):
+    header = title.upper() if layout.get("uppercase") else title
+    if layout.get("numbering") == "arabic":
+        header = f"{tracknumber}. {header}"
+    elif layout.get("numbering") == "roman":
+        header = f"{to_roman(tracknumber)}) {header}"
+    if layout.get("tracklength"):
+        header = f"{header} {tracklength}"
+    return [header, layout["underline"] * len(header)] if layout.get("underline") else [header]
+
+
+def generate_booklet(rng, layout, songs=10, stanzas=(2, 5), stanza_lines=(2, 6), encoding="utf-8",
+                     overlap=0.25, prose=0.5, related_titles=()):
+    """
+    Returns lines of a lyrics booklet and, for every song, its title, header line and first and last lyrics line.
+    Overlap is the chance of a title overlapping another one in the booklet or in related titles (other discs),
+    prose is the chance of credits or notes blocks around the lyrics.
+    """
+    titles = []
+    for _ in range(songs):
+        related = titles + list(related_titles)
+        titles.append(overlapping_title(rng, related, titles) if related and rng.random() < overlap
+                      else random_title(rng, titles))
+    tracklengths = [f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d}" for _ in titles]
+
+    lines = [" ".join(w.capitalize() for w in rng.sample(words, 2)), ""]
+    if rng.random() < prose:
+        lines += prose_block(rng, titles) + [""]
+    if layout.get("tracklist"):
+        lines += [f"{n}. {title} {length}" for n, (title, length) in enumerate(zip(titles, tracklengths), 1)] + [""]
+        if layout.get("separator"):
+            lines += [layout["separator"], ""]
+
+    expected = []
+    for n, (title, length) in enumerate(zip(titles, tracklengths), 1):
+        header = song_header_lines(layout, n, title, length)
+        lines += header + [""]
+        verses = []
+        for stanza in range(rng.randint(*stanzas)):
+            if stanza > 0:
+                verses.append("")
+            verses += [random_verse_line(rng, encoding) for _ in range(rng.randint(*stanza_lines))]
+        lines += verses + ["", ""]
+        if layout.get("separator"):
+            lines += [layout["separator"], ""]
+        expected.append({"title": title, "header": header[0], "firstLine": verses[0], "lastLine": verses[-1]})
+    if rng.random() < prose:
+        lines += prose_block(rng, titles) + [""]
+    return lines, expected
+
+
+def write_booklet(path, lines, encoding="utf-8"):
+    with open(path, "w", encoding=encoding, newline="\r\n") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def generate_tree(root, albums=20, songs=(6, 14), seed=0, layout=None, discs=1, overlap=0.25, prose=0.5):
+    """
+    Writes a directory tree of artist/album folders with one lyrics booklet each, named in one of the ways
+    a default lyrics file can be named. With more discs, every album folder gets a "lyrics CD<n>.txt" booklet
+    per disc instead, with titles overlapping those of other discs as often as within one.
+    Returns a list of {"file", "layout", "encoding", "songs"} entries, one per booklet.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    manifest = []
+    for album_no in range(albums):
+        artist = " ".join(w.capitalize() for w in rng.sample(words, 2))
+        album = " ".join(w.capitalize() for w in rng.sample(words, rng.randint(1, 3)))
+        album_dir = root / artist / f"{album_no:03} {album}"
+        album_dir.mkdir(parents=True, exist_ok=True)
+        filenames = [f"lyrics CD{disc}.txt" for disc in range(1, discs + 1)] if discs > 1 \
+            else [rng.choice(["lyrics.txt", f"{album}.txt", f"{artist} - {album}.txt", "booklet.txt"])]
+        layout_name = layout or rng.choice(list(layouts) + ["random"])
+        album_layout = random_layout(rng) if layout_name == "random" else layouts[layout_name]
+        encoding = rng.choice(list(encodings))
+        album_titles = []
+        for filename in filenames:
+            lines, expected = generate_booklet(rng, album_layout, songs=rng.randint(*songs), encoding=encoding,
+                                               overlap=overlap, prose=prose, related_titles=album_titles)
+            album_titles += [song["title"] for song in expected]
+            write_booklet(album_dir / filename, lines, encoding)
+            manifest.append({"file": str(album_dir / filename), "layout": album_layout, "encoding": encoding,
+                             "songs": expected})
+    return manifest
+
+
+if __name__ == "__main__":
+    import json
+    parser = argparse.ArgumentParser(description="Generate a synthetic tree of album lyrics booklets.")
+    parser.add_argument('root', help="Directory to generate albums in.")
+    parser.add_argument('--albums', type=int, default=20)
+    parser.add_argument('--songs', type=int, nargs=2, default=(6, 14), metavar=('MIN', 'MAX'))
+    parser.add_argument('--layout', choices=list(layouts) + ["random"])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--discs', type=int, default=1, help="Number of booklets per album folder.")
+    parser.add_argument('--overlap', type=float, default=0.25,
+                        help="Chance of a song title overlapping another title of the album.")
+    parser.add_argument('--prose', type=float, default=0.5,
+                        help="Chance of credits or notes before and after the lyrics in a booklet.")
+    parser.add_argument('--manifest', type=argparse.FileType('w'),
+                        help="File to write the list of generated booklets and their songs to, as JSON.")
+    corpus_args = parser.parse_args()
+    generated = generate_tree(corpus_args.root, corpus_args.albums, tuple(corpus_args.songs), corpus_args.seed,
+                              corpus_args.layout, corpus_args.discs, corpus_args.overlap, corpus_args.prose)
+    if corpus_args.manifest:
+        json.dump(generated, corpus_args.manifest, indent=2, ensure_ascii=False)
+    print(f"Generated {sum(len(a['songs']) for a in generated)} songs in {len(generated)} booklets")
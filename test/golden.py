@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+# Golden results of finding lyrics in booklets: record what the reference code path finds for every song,
+# then diff other (optimized) code paths against it and time both.
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+
+if str(Path(__file__).parent.parent) not in sys.path:
+    sys.path.append(str(Path(__file__).parent.parent))
+from src import lyrics
+
+
+def outcome(header, found_lyrics, source=None):
+    lines = found_lyrics.split("\r\n") if found_lyrics else None
+    return {"source": Path(source).name if lines else None,
+            "header": None if header is None else header.header().line,
+            "firstLine": lines[0] if lines else None,
+            "lastLine": lines[-1] if lines else None}
+
+
+def reference_path(lyrics_file, title):
+    # Same single read and analysis of the file as get_lyrics_from_file, keeping the header it found
+    file_lines = lyrics.read_lines_from_file(lyrics_file)
+    if len(file_lines) == 0:
+        return outcome(None, None)
+    header = lyrics.find_song_header(file_lines, title)
+    return outcome(header, "\r\n".join(lyrics.lyrics_under_header(header)) if header is not None else None,
+                   lyrics_file)
+
+
+def planner_path(lyrics_file, title):
+    # Resolves the title the way the command line does, among all lyrics files in the booklet's album folder
+    cwd = os.getcwd()
+    os.chdir(Path(lyrics_file).parent)
+    try:
+        found_lyrics, source, _, header = lyrics.resolve_lyrics_with_source(title)
+    finally:
+        os.chdir(cwd)
+    return outcome(header, found_lyrics, source)
+
+
+code_paths = {"reference": reference_path, "planner": planner_path}
+
+
+def record(manifest, code_path=reference_path):
+    """Runs code path for every song of every booklet in manifest. Returns the results and total time taken."""
+    results = []
+    total = 0.0
+    for booklet in manifest:
+        for song in booklet["songs"]:
+            start = time.perf_counter()
+            try:
+                result = code_path(booklet["file"], song["title"])
+            except Exception as e:
+                result = {"error": type(e).__name__}
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            results.append({"file": booklet["file"], "title": song["title"], **result, "time": elapsed})
+    return results, total
+
+
+def diff(golden, candidate):
+    """Lists every (file, title, field, golden value, candidate value) that differs between two sets of results."""
+    def keyed(results):
+        return {(r["file"], r["title"]): r for r in results}
+
+    golden_by_key, candidate_by_key = keyed(golden), keyed(candidate)
+    mismatches = []
+    for key, expected in golden_by_key.items():
+        actual = candidate_by_key.get(key, {"missing": True})
+        for field in sorted((set(expected) | set(actual)) - {"file", "title", "time"}):
+            if expected.get(field) != actual.get(field):
+                mismatches.append((*key, field, expected.get(field), actual.get(field)))
+    return mismatches
+
+
+def compare(manifest, candidate, golden=None, reference=reference_path):
+    """
+    Diffs candidate code path against golden results (recorded from reference code path if not given).
+    Returns the mismatches and the time taken by reference (None if golden results were given) and candidate.
+    """
+    reference_time = None
+    if golden is None:
+        golden, reference_time = record(manifest, reference)
+    candidate_results, candidate_time = record(manifest, candidate)
+    return diff(golden, candidate_results), reference_time, candidate_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record golden lyrics lookup results or check a code path "
+                                                 "against them.")
+    parser.add_argument('mode', choices=['record', 'check'])
+    parser.add_argument('manifest', type=argparse.FileType('r'), help="Booklets manifest, as written by corpus.py.")
+    parser.add_argument('golden', help="Golden results file to write (record) or read (check).")
+    parser.add_argument('--path', choices=list(code_paths), default="reference",
+                        help="Code path to record or check.")
+    golden_args = parser.parse_args()
+    booklets = json.load(golden_args.manifest)
+
+    if golden_args.mode == 'record':
+        recorded, took = record(booklets, code_paths[golden_args.path])
+        with open(golden_args.golden, "w", encoding="utf-8") as gf:
+            json.dump(recorded, gf, indent=2, ensure_ascii=False)
+        print(f"Recorded {len(recorded)} results of {golden_args.path} path in {took:.3f}s")
+    else:
+        with open(golden_args.golden, encoding="utf-8") as gf:
+            recorded = json.load(gf)
+        found_mismatches, _, took = compare(booklets, code_paths[golden_args.path], golden=recorded)
+        golden_took = sum(r["time"] for r in recorded)
+        for mismatch in found_mismatches:
+            print("{} / {}: {} was {!r}, is {!r}".format(*mismatch))
+        print(f"{len(found_mismatches)} mismatches; {golden_args.path} path took {took:.3f}s, "
+              f"golden results took {golden_took:.3f}s")
+        sys.exit(1 if found_mismatches else 0)
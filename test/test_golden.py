@@ -0,0 +1,139 @@
+import unittest
+import random
+import tempfile
+from collections import Counter
+from pathlib import Path
+import corpus
+import golden
+
+
+class CorpusTest(unittest.TestCase):
+    def test_same_seed_same_tree(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            first_manifest = corpus.generate_tree(first, albums=3, seed=7)
+            second_manifest = corpus.generate_tree(second, albums=3, seed=7)
+            self.assertEqual([a["songs"] for a in first_manifest], [a["songs"] for a in second_manifest])
+            for a, b in zip(first_manifest, second_manifest):
+                self.assertEqual(Path(a["file"]).read_bytes(), Path(b["file"]).read_bytes())
+
+    def test_headers(self):
+        def header_lines(layout_name, tracknumber=3):
+            return corpus.song_header_lines(corpus.layouts[layout_name], tracknumber, "Iron Sky", "4:05")
+
+        self.assertEqual(header_lines("numbered"), ["3. Iron Sky"])
+        self.assertEqual(header_lines("roman", 14), ["xiv) Iron Sky"])
+        self.assertEqual(header_lines("underlined"), ["Iron Sky", "--------"])
+        self.assertEqual(header_lines("uppercase"), ["IRON SKY"])
+        self.assertEqual(header_lines("tracklength"), ["3. Iron Sky 4:05"])
+
+    def test_overlapping_titles(self):
+        _, songs = corpus.generate_booklet(random.Random(3), corpus.layouts["plain"], songs=8, overlap=1.0)
+        titles = [song["title"].lower() for song in songs]
+        self.assertEqual(len(set(titles)), len(titles))
+        for n, title in enumerate(titles[1:], 1):
+            with self.subTest(title=title):
+                self.assertTrue(any(title in other or other in title
+                                    or title.rstrip("?") == other or title.replace("the ", "", 1) == other
+                                    or title.startswith(other.rsplit(" ", 1)[0]) for other in titles[:n]))
+
+    def test_prose(self):
+        lines, songs = corpus.generate_booklet(random.Random(3), corpus.layouts["plain"], songs=4, prose=1.0)
+        headers_and_lyrics = sum(([s["header"], s["firstLine"], s["lastLine"]] for s in songs), [])
+        self.assertTrue(any(line and line not in headers_and_lyrics and line != lines[0]
+                            for line in lines[:lines.index(songs[0]["header"])]))
+
+    def test_booklet_contains_songs(self):
+        lines, songs = corpus.generate_booklet(random.Random(1), corpus.layouts["tracklist"], songs=5)
+        self.assertEqual(len(songs), 5)
+        for song in songs:
+            self.assertEqual(lines.count(song["header"]), 1)
+            self.assertIn(song["firstLine"], lines)
+            self.assertIn(song["lastLine"], lines)
+
+
+class GoldenTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.manifest = corpus.generate_tree(self.tempdir.name, albums=16, songs=(4, 8), seed=1)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    @staticmethod
+    def found_as_generated(manifest, results):
+        expected = {(a["file"], s["title"]): s for a in manifest for s in a["songs"]}
+        return [(r.get("header"), r.get("firstLine"), r.get("lastLine")) ==
+                (expected[(r["file"], r["title"])]["header"], expected[(r["file"], r["title"])]["firstLine"],
+                 expected[(r["file"], r["title"])]["lastLine"]) for r in results]
+
+    def test_reference_finds_plain_lyrics(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            manifest = corpus.generate_tree(tempdir, albums=len(corpus.layouts), songs=(3, 5), seed=1,
+                                            overlap=0, prose=0)
+            results, _ = golden.record(manifest)
+            self.assertTrue(all(self.found_as_generated(manifest, results)))
+
+    def test_golden_results_have_near_misses(self):
+        results, _ = golden.record(self.manifest)
+        found = self.found_as_generated(self.manifest, results)
+        self.assertGreater(found.count(True), len(found) * 0.8)
+        self.assertGreater(found.count(False), 0)
+
+    def test_reference_is_get_lyrics_from_file(self):
+        for booklet in self.manifest:
+            for title in [song["title"] for song in booklet["songs"]] + ["Nowhere To Be Found"]:
+                with self.subTest(file=booklet["file"], title=title):
+                    found_lyrics = golden.lyrics.get_lyrics_from_file(booklet["file"], title)
+                    result = golden.reference_path(booklet["file"], title)
+                    self.assertEqual(result, golden.outcome(golden.lyrics.find_song_header(
+                        golden.lyrics.read_lines_from_file(booklet["file"]), title), found_lyrics, booklet["file"]))
+
+    def test_diff_finds_changed_results(self):
+        def without_last_line(lyrics_file, title):
+            return {**golden.reference_path(lyrics_file, title), "lastLine": None}
+
+        mismatches, reference_time, candidate_time = golden.compare(self.manifest, golden.reference_path)
+        self.assertEqual(mismatches, [])
+        self.assertIsNotNone(reference_time)
+        self.assertIsNotNone(candidate_time)
+
+        mismatches, _, _ = golden.compare(self.manifest, without_last_line)
+        self.assertEqual(len(mismatches), sum(len(a["songs"]) for a in self.manifest))
+        self.assertTrue(all(m[2] == "lastLine" for m in mismatches))
+
+    def test_planner_matches_reference(self):
+        not_in_booklet = [{**a, "songs": a["songs"] + [{"title": "Nowhere To Be Found"}]} for a in self.manifest]
+        mismatches, _, _ = golden.compare(not_in_booklet, golden.planner_path)
+        self.assertEqual(mismatches, [])
+
+
+class MultiDiscGoldenTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.manifest = corpus.generate_tree(self.tempdir.name, albums=6, songs=(3, 6), seed=2, discs=3)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def album_titles(self):
+        return [(Path(a["file"]).parent, a["file"], s["title"].lower()) for a in self.manifest for s in a["songs"]]
+
+    def test_titles_contained_across_discs(self):
+        self.assertTrue(any(album == other_album and file != other_file and title != other and other in title
+                            for album, file, title in self.album_titles()
+                            for other_album, other_file, other in self.album_titles()))
+
+    def test_planner_finds_songs_among_discs(self):
+        self.assertEqual(len(self.manifest), 18)
+        golden_results, _ = golden.record(self.manifest)
+        missed = {(r["file"], r["title"]) for r, found in
+                  zip(golden_results, GoldenTest.found_as_generated(self.manifest, golden_results)) if not found}
+        not_on_any_disc = [{**a, "songs": [{"title": "Nowhere To Be Found"}]} for a in self.manifest]
+        golden_results += golden.record(not_on_any_disc)[0]
+
+        mismatches, _, _ = golden.compare(self.manifest + not_on_any_disc, golden.planner_path, golden=golden_results)
+        titles_per_album = Counter((album, title) for album, _, title in self.album_titles())
+        # A title repeated on another disc of the album cannot be told apart by title alone, and where the reference
+        # path misses a song within its own disc, a closer title on another disc is as good a guess
+        self.assertEqual([m for m in mismatches if titles_per_album[(Path(m[0]).parent, m[1].lower())] <= 1
+                          and (m[0], m[1]) not in missed], [])
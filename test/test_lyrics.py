@@ -36,6 +36,23 @@ class UtilTest(unittest.TestCase):
         self.assertFalse(lyrics.is_monotonic([2, 2, 1]))
         self.assertFalse(lyrics.is_monotonic([2, 3, 4, 5, 4]))
 
+    def test_song_filename(self):
+        self.assertTrue(lyrics.looks_like_song_filename("01 Song.mp3"))
+        self.assertTrue(lyrics.looks_like_song_filename("01 Song.FLAC"))
+        self.assertTrue(lyrics.looks_like_song_filename("01 Song.ogg"))
+        self.assertTrue(lyrics.looks_like_song_filename("01 Song.opus"))
+        self.assertTrue(lyrics.looks_like_song_filename("01 Song.m4a"))
+        self.assertFalse(lyrics.looks_like_song_filename("lyrics.txt"))
+        self.assertFalse(lyrics.looks_like_song_filename("Song"))
+
+    def test_title_may_be_in(self):
+        file_lines = ["1. Don't Say A Word 03:38\n", "\n", "2. Stay By My Side (Journey)\n", "9. Fu Inl\u00e9\n"]
+        self.assertTrue(lyrics.title_may_be_in(file_lines, "Don't Say a Word"))
+        self.assertTrue(lyrics.title_may_be_in(file_lines, "Stand By My Side"))
+        self.assertTrue(lyrics.title_may_be_in(file_lines, "Fu Inle"))
+        self.assertFalse(lyrics.title_may_be_in(file_lines, "Under the Radar"))
+        self.assertFalse(lyrics.title_may_be_in([], "Under the Radar"))
+
 
 class LinesTest(unittest.TestCase):
     def test_blank(self):
@@ -90,6 +107,12 @@ class LyricsFileAnalysis(unittest.TestCase):
         parts = lyrics.analyze_lyrics_file(lines.split("\n"))
         self.assertEqual(len([t for t in parts if t.is_tracklist]), 1)
 
+    def test_underlined_headers_under_stronger_header(self):
+        parts = lyrics.analyze_lyrics_file(lyrics.read_lines_from_file(test_resources_dir / "pinkfloyd.txt"))
+        total_time = [p for p in parts if p.type is lyrics.TextLine and p.header().line == "Total time 42:00"][0]
+        self.assertEqual(total_time.next.to_lines(), ["IN THE FLESH ?", ""])
+        self.assertEqual(lyrics.lyrics_under_header(total_time)[:4], ["IN THE FLESH ?", "", "So ya", "Thought ya"])
+
 
 class LyricsTest(unittest.TestCase):
     def test_lyrics_begin(self):
@@ -155,3 +178,311 @@ class LyricsTest(unittest.TestCase):
                         self.assertEqual(found_lyrics[-1], single_song['lastLine'])
 
 
+class AudioTagsTest(unittest.TestCase):
+    # Smallest files mutagen accepts for every supported format, with no audio in them
+
+    @staticmethod
+    def write_mp3(path):
+        path.write_bytes((b"\xff\xfb\x90\x64" + bytes(413)) * 5)
+
+    @staticmethod
+    def write_flac(path):
+        stream_info = bytes([0x10, 0x00, 0x10, 0x00]) + bytes(6) + bytes([0x0A, 0xC4, 0x42, 0xF0]) + bytes(20)
+        path.write_bytes(b"fLaC" + bytes([0x80, 0x00, 0x00, len(stream_info)]) + stream_info)
+
+    @staticmethod
+    def write_ogg(path, packets):
+        from mutagen.ogg import OggPage
+        pages = []
+        for sequence, packet in enumerate(packets):
+            page = OggPage()
+            page.serial, page.sequence, page.packets, page.first = 1, sequence, [packet], sequence == 0
+            pages.append(page)
+        pages[-1].last = True
+        path.write_bytes(b"".join(page.write() for page in pages))
+
+    @staticmethod
+    def write_vorbis(path):
+        import struct
+        AudioTagsTest.write_ogg(path, [b"\x01vorbis" + struct.pack('<IBIiii', 0, 2, 44100, 0, 128000, 0) + b"\xb8\x01",
+                                       b"\x03vorbis" + struct.pack('<II', 0, 0) + b"\x01",
+                                       b"\x05vorbis"])
+
+    @staticmethod
+    def write_opus(path):
+        import struct
+        AudioTagsTest.write_ogg(path, [b"OpusHead" + struct.pack('<BBHIhB', 1, 2, 0, 48000, 0, 0),
+                                       b"OpusTags" + struct.pack('<II', 0, 0)])
+
+    @staticmethod
+    def write_m4a(path):
+        import struct
+
+        def atom(name, data):
+            return struct.pack('>I', 8 + len(data)) + name + data
+
+        movie_header = atom(b"mvhd", bytes(12) + struct.pack('>II', 1000, 0) + bytes(80))
+        path.write_bytes(atom(b"ftyp", b"M4A \0\0\0\0M4A mp42isom") + atom(b"moov", movie_header))
+
+    writers = {".mp3": write_mp3, ".flac": write_flac, ".ogg": write_vorbis, ".opus": write_opus, ".m4a": write_m4a}
+
+    @staticmethod
+    def write_song(path, title=None, artist=None, album=None):
+        AudioTagsTest.writers[path.suffix].__func__(path)
+        song = lyrics.SongMP3(path)
+        for key, value in {"title": title, "artist": artist, "album": album}.items():
+            if value is not None:
+                song.tags[key] = value
+        song.audio.save()
+        return lyrics.SongMP3(path)
+
+    def test_lyrics_roundtrip(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            for suffix in self.writers:
+                with self.subTest(suffix=suffix):
+                    path = Path(tempdir) / f"01 Song{suffix}"
+                    song = self.write_song(path, title="Song", artist="Artist")
+                    self.assertEqual(song.title, "Song")
+                    self.assertEqual(song.artist, "Artist")
+                    self.assertIsNone(song.get_lyrics())
+
+                    self.assertTrue(song.set_lyrics("Line one\r\nLine two"))
+                    self.assertFalse(song.set_lyrics("Line one\r\nLine two"))
+                    self.assertEqual(lyrics.SongMP3(path).get_lyrics(), "Line one\r\nLine two")
+                    self.assertTrue(lyrics.SongMP3(path).set_lyrics("Line three"))
+                    self.assertEqual(lyrics.SongMP3(path).get_lyrics(), "Line three")
+
+    def test_native_lyrics_fields(self):
+        import tempfile
+        from mutagen import id3, flac, oggvorbis, oggopus, mp4
+        with tempfile.TemporaryDirectory() as tempdir:
+            for suffix, read_native in {".mp3": lambda p: id3.ID3(p)["USLT::eng"].text,
+                                        ".flac": lambda p: flac.FLAC(p)["LYRICS"][0],
+                                        ".ogg": lambda p: oggvorbis.OggVorbis(p)["LYRICS"][0],
+                                        ".opus": lambda p: oggopus.OggOpus(p)["LYRICS"][0],
+                                        ".m4a": lambda p: mp4.MP4(p)["\xa9lyr"][0]}.items():
+                with self.subTest(suffix=suffix):
+                    path = Path(tempdir) / f"Song{suffix}"
+                    self.write_song(path).set_lyrics("Lyrics")
+                    self.assertEqual(read_native(path), "Lyrics")
+
+    def test_from_path(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            for name in ["01 One.flac", "02 Two.opus", "03 Three.m4a"]:
+                self.write_song(Path(tempdir) / name)
+            (Path(tempdir) / "lyrics.txt").write_text("lyrics")
+            songs = lyrics.SongMP3.from_path(str(Path(tempdir) / "*"))
+            self.assertEqual([s.title for s in songs], ["01 One", "02 Two", "03 Three"])
+
+    def test_format_from_content(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            self.write_opus(Path(tempdir) / "01 Opus.ogg")
+            self.write_flac(Path(tempdir) / "02 Flac.ogg")
+            (Path(tempdir) / "03 Broken.ogg").write_bytes(b"not audio")
+            songs = lyrics.SongMP3.from_path(str(Path(tempdir) / "*"))
+            self.assertEqual([s.title for s in songs], ["01 Opus", "02 Flac"])
+            self.assertTrue(songs[0].set_lyrics("Lyrics"))
+            self.assertEqual(lyrics.SongMP3(songs[0].path).get_lyrics(), "Lyrics")
+
+
+class ResolveTest(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tempdir.name)
+        self.song = AudioTagsTest.write_song(self.dir / "01 Silver Road.flac", title="Silver Road")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write_booklet(self, name, headers, padding=0):
+        lines = []
+        for header in headers:
+            lines += [header, "", f"First line of {header}", f"Last line of {header}", "", "=" * 10, ""]
+        (self.dir / name).write_text("\n".join(lines + [""] * padding), encoding="utf-8")
+
+    def resolve(self, song=None):
+        from unittest import mock
+        with mock.patch.object(lyrics, 'read_lines_from_file', wraps=lyrics.read_lines_from_file) as reads, \
+                mock.patch.object(lyrics, 'find_song_header_in_parts', wraps=lyrics.find_song_header_in_parts) \
+                as analyses:
+            found_lyrics, source, confidence, _ = lyrics.resolve_lyrics_with_source(song or self.song)
+        return found_lyrics, source, confidence, [Path(c.args[0]).name for c in reads.call_args_list], \
+            [c.args[1] for c in analyses.call_args_list]
+
+    def test_tag_first(self):
+        self.write_booklet("lyrics.txt", ["Iron Sky", "Silver Road"])
+        self.song.set_lyrics("From tag")
+        found_lyrics, source, confidence, reads, _ = self.resolve()
+        self.assertEqual((found_lyrics, source, confidence, reads), ("From tag", "audio tag", 1.0, []))
+
+    def test_smallest_first(self):
+        self.write_booklet("lyrics 1.txt", ["Iron Sky", "Silver Road"], padding=100)
+        self.write_booklet("lyrics 2.txt", ["Wild Garden", "Silver Road"])
+        self.write_booklet("notes.txt", ["Silver Road"])
+        self.assertEqual([f.name for f in lyrics.ranked_lyrics_files(self.song)], ["lyrics 2.txt", "lyrics 1.txt"])
+
+    def test_early_exit_on_confident_match(self):
+        self.write_booklet("lyrics 1.txt", ["Iron Sky", "Silver Road"])
+        self.write_booklet("lyrics 2.txt", ["Wild Garden", "Silver Road"], padding=100)
+        found_lyrics, source, confidence, reads, _ = self.resolve()
+        self.assertEqual(found_lyrics, "First line of Silver Road\r\nLast line of Silver Road")
+        self.assertEqual((source.name, confidence), ("lyrics 1.txt", 1.0))
+        self.assertEqual(reads, ["lyrics 1.txt"])
+
+    def test_best_of_all_files(self):
+        self.write_booklet("lyrics 1.txt", ["Iron Sky", "Sliver Road"])
+        self.write_booklet("lyrics 2.txt", ["Wild Garden", "Silver Road"], padding=100)
+        found_lyrics, source, confidence, reads, _ = self.resolve()
+        self.assertEqual((source.name, confidence), ("lyrics 2.txt", 1.0))
+        self.assertEqual(reads, ["lyrics 1.txt", "lyrics 2.txt"])
+
+        (self.dir / "lyrics 2.txt").unlink()
+        found_lyrics, source, confidence, _, _ = self.resolve()
+        self.assertEqual(found_lyrics, "First line of Sliver Road\r\nLast line of Sliver Road")
+        self.assertEqual(source.name, "lyrics 1.txt")
+        self.assertLess(confidence, 1.0 - lyrics.confident_distance)
+
+    def test_skips_files_without_title(self):
+        self.write_booklet("lyrics 1.txt", ["Iron Sky", "Wild Garden"])
+        self.write_booklet("lyrics 2.txt", ["Wild Garden", "Silver Road"], padding=100)
+        found_lyrics, source, _, reads, analyzed = self.resolve()
+        self.assertEqual(source.name, "lyrics 2.txt")
+        self.assertEqual(reads, ["lyrics 1.txt", "lyrics 2.txt"])
+        self.assertEqual(len(analyzed), 1)
+
+    def test_titles_contained_across_discs(self):
+        self.write_booklet("lyrics CD1.txt", ["Sea Steam", "Crimson Machine?", "Silver Road"])
+        self.write_booklet("lyrics CD2.txt", ["Steam", "Crimson Machine", "Wild Garden"], padding=100)
+        for title, disc in [("Sea Steam", "CD1"), ("Steam", "CD2"), ("Crimson Machine?", "CD1"),
+                            ("Crimson Machine", "CD2")]:
+            with self.subTest(title=title):
+                song = AudioTagsTest.write_song(self.dir / f"{title}.flac", title=title)
+                found_lyrics, source, confidence, _, _ = self.resolve(song)
+                self.assertEqual(found_lyrics, f"First line of {title}\r\nLast line of {title}")
+                self.assertEqual((source.name, confidence), (f"lyrics {disc}.txt", 1.0))
+
+    def test_reads_and_analyzes_each_file_once(self):
+        from unittest import mock
+        self.write_booklet("lyrics 1.txt", ["Iron Sky", "Wild Garden"])
+        self.write_booklet("lyrics 2.txt", ["Wild Gardens", "Silver Road"], padding=100)
+        self.assertEqual(self.resolve()[3], ["lyrics 1.txt", "lyrics 2.txt"])
+        song = AudioTagsTest.write_song(self.dir / "02 Wild Gardens.flac", title="Wild Gardens")
+        with mock.patch.object(lyrics, 'analyze_lyrics_file', wraps=lyrics.analyze_lyrics_file) as analyses:
+            _, source, _, reads, analyzed = self.resolve(song)
+        self.assertEqual((source.name, reads, len(analyzed)), ("lyrics 2.txt", [], 2))
+        self.assertEqual(analyses.call_count, 1)
+
+        self.write_booklet("lyrics 1.txt", ["Iron Sky", "Quiet Storm", "Silver Road"])
+        _, source, _, reads, _ = self.resolve()
+        self.assertEqual((source.name, reads), ("lyrics 1.txt", ["lyrics 1.txt"]))
+
+    def test_not_found(self):
+        self.write_booklet("lyrics.txt", ["Iron Sky", "Wild Garden"])
+        self.assertEqual(self.resolve()[:3], (None, None, None))
+
+
+class ExportTest(unittest.TestCase):
+    @staticmethod
+    def write_flac(path):
+        return AudioTagsTest.write_song(path, title=path.stem, artist="Artist", album="Album")
+
+    def test_write_if_changed(self):
+        import os
+        import tempfile
+        umask = os.umask(0o022)
+        try:
+            with tempfile.TemporaryDirectory() as tempdir:
+                sidecar = Path(tempdir) / "song.txt"
+                self.assertTrue(lyrics.write_if_changed(sidecar, "Line one\r\nLine two"))
+                self.assertEqual(sidecar.stat().st_mode & 0o777, 0o644)
+                self.assertFalse(lyrics.write_if_changed(sidecar, "Line one\r\nLine two"))
+                sidecar.chmod(0o664)
+                self.assertTrue(lyrics.write_if_changed(sidecar, "Line one"))
+                self.assertEqual(sidecar.read_bytes(), b"Line one")
+                self.assertEqual(sidecar.stat().st_mode & 0o777, 0o664)
+                self.assertEqual([f.name for f in Path(tempdir).iterdir()], ["song.txt"])
+        finally:
+            os.umask(umask)
+
+    def test_write_if_changed_cleans_up(self):
+        import os
+        import tempfile
+        from unittest import mock
+        with tempfile.TemporaryDirectory() as tempdir:
+            with mock.patch.object(os, 'replace', side_effect=OSError("disk full")):
+                self.assertRaises(OSError, lyrics.write_if_changed, Path(tempdir) / "song.txt", "Line one")
+            self.assertEqual(list(Path(tempdir).iterdir()), [])
+
+    def test_export_lyrics(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            first = self.write_flac(Path(tempdir) / "01 First.flac")
+            second = self.write_flac(Path(tempdir) / "02 Second.flac")
+            self.assertEqual(first.title, "01 First")
+
+            lyrics.export_lyrics({first: "One\r\nTwo", second: "Three"}, ['lrc', 'txt', 'jsonl'])
+            self.assertEqual((Path(tempdir) / "01 First.lrc").read_text(encoding="utf-8"),
+                             "[ar:Artist]\n[al:Album]\n[ti:01 First]\nOne\nTwo\n")
+            self.assertEqual((Path(tempdir) / "02 Second.lyrics.txt").read_text(encoding="utf-8"), "Three")
+            self.assertEqual((Path(tempdir) / lyrics.exported_sidecars_name).read_text(encoding="utf-8"),
+                             "01 First.lrc\n01 First.lyrics.txt\n02 Second.lrc\n02 Second.lyrics.txt\n")
+            manifest = lyrics.read_lyrics_manifest(Path(tempdir) / lyrics.lyrics_manifest_name)
+            self.assertEqual(sorted(manifest), ["01 First.flac", "02 Second.flac"])
+            self.assertEqual(manifest["02 Second.flac"]["lyrics"], "Three")
+
+            lyrics.export_lyrics({second: "Four"}, ['jsonl'])
+            manifest = lyrics.read_lyrics_manifest(Path(tempdir) / lyrics.lyrics_manifest_name)
+            self.assertEqual(manifest["01 First.flac"]["lyrics"], "One\r\nTwo")
+            self.assertEqual(manifest["02 Second.flac"]["lyrics"], "Four")
+
+    def test_export_keeps_lyrics_files_found(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            song = AudioTagsTest.write_song(Path(tempdir) / "02 Night Fire.flac", title="Night Fire",
+                                            artist="Artist", album="Night Fire")
+            (Path(tempdir) / "Booklet.txt").write_text("Iron Sky\n\nOne\n\n=====\n\nNight Fire\n\nTwo\nThree\n",
+                                                       encoding="utf-8")
+            found_lyrics = lyrics.resolve_lyrics(song)
+            self.assertEqual(found_lyrics, "Two\r\nThree")
+
+            lyrics.export_lyrics({song: found_lyrics}, ['txt'])
+            self.assertTrue((Path(tempdir) / "02 Night Fire.lyrics.txt").exists())
+            self.assertEqual([f.name for f in lyrics.ranked_lyrics_files(song)], ["Booklet.txt"])
+            self.assertEqual(lyrics.resolve_lyrics(song), found_lyrics)
+
+    def test_export_keeps_files_not_exported(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            song = AudioTagsTest.write_song(Path(tempdir) / "Iron Sky.mp3", title="Iron Sky")
+            booklet = "Wild Garden\n\nOne\n\n=====\n\nIron Sky\n\nTwo\nThree\n"
+            (Path(tempdir) / "Iron Sky.txt").write_text(booklet, encoding="utf-8")
+            (Path(tempdir) / "Iron Sky.lrc").write_text("[00:01.00]Two\n[00:05.00]Three\n", encoding="utf-8")
+            found_lyrics = lyrics.resolve_lyrics(song)
+            self.assertEqual(found_lyrics, "Two\r\nThree")
+
+            lyrics.export_lyrics({song: found_lyrics}, ['txt', 'lrc'])
+            self.assertEqual((Path(tempdir) / "Iron Sky.lyrics.txt").read_text(encoding="utf-8"), "Two\nThree")
+            self.assertEqual((Path(tempdir) / "Iron Sky.txt").read_text(encoding="utf-8"), booklet)
+            self.assertEqual((Path(tempdir) / "Iron Sky.lrc").read_text(encoding="utf-8"),
+                             "[00:01.00]Two\n[00:05.00]Three\n")
+            self.assertEqual([f.name for f in lyrics.ranked_lyrics_files(song)], ["Iron Sky.txt"])
+
+            lyrics.export_lyrics({song: "Two"}, ['txt'])
+            self.assertEqual((Path(tempdir) / "Iron Sky.lyrics.txt").read_text(encoding="utf-8"), "Two")
+
+    def test_export_keeps_unreadable_manifest(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tempdir:
+            song = self.write_flac(Path(tempdir) / "01 First.flac")
+            manifest_file = Path(tempdir) / lyrics.lyrics_manifest_name
+            for content in ['{"path": "02 Second.flac", "lyrics": "Three"}\n[1, 2]\n',
+                            '{"path": "02 Second.flac", "lyrics": "Three"}\n{"path": \n']:
+                with self.subTest(content=content):
+                    manifest_file.write_text(content, encoding="utf-8")
+                    self.assertIsNone(lyrics.read_lyrics_manifest(manifest_file))
+                    lyrics.export_lyrics({song: "One"}, ['jsonl'])
+                    self.assertEqual(manifest_file.read_text(encoding="utf-8"), content)